@@ -1,119 +1,128 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import plotly.io as pio
 import os
-import requests
-from bs4 import BeautifulSoup
-import re
-from pytz import timezone
+from zoneinfo import ZoneInfo
 import datetime
-from streamlit_autorefresh import st_autorefresh
+import functools
+import threading
 
-# ========== Auto-refresh every 60 seconds ==========
-st_autorefresh(interval=60 * 1000, key="auto-refresh")
+from data import append_log, is_logged, load_building_log, load_log, log_mtime, read_marker, write_marker
+from data import monthly_source, source_exists, source_mtime
+from data import downsample_for_plot, log_csv_bytes, monthly_summary, year_slice, yearly_totals
+from weather import fetch_live_weather
 
 # ========== Settings ==========
 BUILDING_NAME = "CEED"
 ROOFTOP_AREA = 1000  # m²
 RUNOFF_COEFFICIENT = 0.85
-MONTHLY_LOG_FILE = "dashboard/rainfall_log.csv"
-DAILY_LOG_FILE = "dashboard/daily_log.csv"
-
-# ========== Time ==========
-ist = timezone('Asia/Kolkata')
-now = datetime.datetime.now(ist)
-today_str = now.strftime("%Y-%m-%d")
-st.write("🕒 Current Time:", now.strftime("%Y-%m-%d %H:%M:%S"))
-
-# ========== Fetch Live Weather ==========
-def fetch_live_weather():
-    url = "https://iust.ac.in/"
-    try:
-        r = requests.get(url, timeout=5)
-        soup = BeautifulSoup(r.text, "html.parser")
-        text = soup.get_text(separator=" ", strip=True)
-        pattern = r"Temperature[:\s]*([\d]+).*?C.*?Humidity[:\s]*([\d]+).*?%.*?Rainfall[:\s]*([\d]+).*?mm"
-        m = re.search(pattern, text, re.DOTALL)
-        if m:
-            temp, hum, rain = m.groups()
-            return int(temp), int(hum), int(rain)
-    except Exception as e:
-        st.error(f"Error fetching weather: {e}")
-    return None, None, None
+MONTHLY_LOG_FILE = "dashboard/rainfall_log.parquet"  # Archive of months before the daily log
+DAILY_LOG_FILE = "dashboard/daily_log"  # Parquet dataset partitioned by year
+LAST_LOGGED_FILE = "dashboard/.last_logged"  # Building and date of the last daily log entry
+MONTHLY_SOURCE = monthly_source(DAILY_LOG_FILE, MONTHLY_LOG_FILE)
+LIVE_REFRESH_SECONDS = 60
+
+ist = ZoneInfo('Asia/Kolkata')
 
 # ========== Calculate Harvest ==========
+@functools.lru_cache(maxsize=32)
 def calculate_harvest(rain_mm):
     return rain_mm * ROOFTOP_AREA * RUNOFF_COEFFICIENT
 
-# ========== Load Logs ==========
-def load_log(file_path):
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        return df.dropna(subset=['date'])
-    return pd.DataFrame(columns=['date', 'building_name', 'rainfall_mm', 'water_harvested_litres'])
-
-# ========== Save Logs ==========
-def save_log(df, file_path):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    df.to_csv(file_path, index=False)
-
-# ========== Load Data ==========
-df_daily = load_log(DAILY_LOG_FILE)
-df_monthly = load_log(MONTHLY_LOG_FILE)
-
 # ========== Fetch Today's Data ==========
-temp, hum, rain_today = fetch_live_weather()
-if rain_today is None:
-    st.warning("Live weather data unavailable. Using fallback value: 0 mm")
-    rain_today = 0
-
-today_harvest = calculate_harvest(rain_today)
+def get_live_reading():
+    weather = fetch_live_weather()
+    rain_today = weather['rainfall_mm']
+    if rain_today is None:
+        rain_today = 0
+    return weather, rain_today, calculate_harvest(rain_today)
 
 # ========== Delayed Daily Logging at 11:55 PM ==========
-df_daily['date'] = pd.to_datetime(df_daily['date'], errors='coerce')
-df_daily = df_daily.dropna(subset=['date'])
-df_daily['date_only'] = df_daily['date'].dt.date
-
-if now.hour == 23 and now.minute >= 55:
-    if now.date() not in df_daily['date_only'].values:
-        new_daily_row = {
-            'date': pd.to_datetime(today_str),
-            'building_name': BUILDING_NAME,
-            'rainfall_mm': rain_today,
-            'water_harvested_litres': int(today_harvest)
-        }
-        df_daily = pd.concat([df_daily.drop(columns=['date_only']), pd.DataFrame([new_daily_row])], ignore_index=True)
-        save_log(df_daily, DAILY_LOG_FILE)
-
-# ========== Update Monthly Log if New Month Starts ==========
-if now.day == 1 and len(df_daily) > 0:
-    prev_month = (now.replace(day=1) - datetime.timedelta(days=1)).month
-    prev_year = (now.replace(day=1) - datetime.timedelta(days=1)).year
-    df_prev_month = df_daily[(df_daily['date'].dt.month == prev_month) & (df_daily['date'].dt.year == prev_year)]
-    if not df_prev_month.empty:
-        total_rainfall = df_prev_month['rainfall_mm'].sum()
-        total_harvest = df_prev_month['water_harvested_litres'].sum()
-        summary_date = f"{prev_year}-{prev_month:02d}-01"
-
-        if not df_monthly['date'].dt.strftime("%Y-%m").isin([f"{prev_year}-{prev_month:02d}"]).any():
-            new_monthly_row = {
-                'date': pd.to_datetime(summary_date),
+@st.cache_resource
+def get_log_lock():
+    # One lock for every session in this server process
+    return threading.Lock()
+
+def log_daily_reading(now, rain_today, today_harvest):
+    if not (now.hour == 23 and now.minute >= 55):
+        return False
+    # Keyed on the building too, so a marker left by another building's
+    # dashboard never skips this one
+    logged_key = f"{BUILDING_NAME} {now.date().isoformat()}"
+    # Sessions run in parallel threads; without the lock two of them could
+    # both pass the checks below and append the same day twice
+    with get_log_lock():
+        # The marker answers "already logged today?" without loading the log
+        if read_marker(LAST_LOGGED_FILE) == logged_key:
+            return False
+        df_daily = load_log(DAILY_LOG_FILE)
+        append_needed = not is_logged(df_daily, now.date(), BUILDING_NAME)
+        if append_needed:
+            new_daily_row = {
+                'date': pd.Timestamp(now.date()),
                 'building_name': BUILDING_NAME,
-                'rainfall_mm': total_rainfall,
-                'water_harvested_litres': int(total_harvest)
+                'rainfall_mm': rain_today,
+                'water_harvested_litres': int(today_harvest)
             }
-            df_monthly = pd.concat([df_monthly, pd.DataFrame([new_monthly_row])], ignore_index=True)
-            save_log(df_monthly, MONTHLY_LOG_FILE)
-
-# ========== UI ==========
-st.title("Rainwater Harvesting Dashboard - IUST Campus (CEED)")
+            append_log(pd.DataFrame([new_daily_row]), DAILY_LOG_FILE)
+        write_marker(LAST_LOGGED_FILE, logged_key)
+    return append_needed
+
+# ========== Charts ==========
+# Cached as figure JSON: rebuilding a Plotly figure runs validation and
+# serialisation in Python even when the input frame has not changed
+@st.cache_data(show_spinner=False)
+def build_monthly_fig(month_df):
+    # plotly.express is only imported on a cache miss
+    import plotly.express as px
+    fig = px.bar(month_df, x='month', y='water_harvested_litres', labels={'water_harvested_litres': 'Litres'}, color_discrete_sequence=["teal"])
+    return fig.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_daily_fig(plot_df, title):
+    import plotly.express as px
+    fig = px.line(plot_df, x='date', y=['rainfall_mm', 'water_harvested_litres'], labels={"value": "Amount", "variable": "Metric"}, title=title, render_mode='webgl')
+    return fig.to_json()
+
+# ========== Live Header ==========
+# Fragments re-run on their own timer, so the minute-by-minute refresh no
+# longer re-executes the tabs, their aggregations and their charts
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_header():
+    now = datetime.datetime.now(ist)
+    st.write("🕒 Current Time:", now.strftime("%Y-%m-%d %H:%M:%S"))
+
+    weather, rain_today, today_harvest = get_live_reading()
+    if weather['error']:
+        st.error(f"Error fetching weather: {weather['error']}")
+    if weather['rainfall_mm'] is None:
+        st.warning("Live weather data unavailable. Using fallback value: 0 mm")
+
+    # The write-side checks only need to run once per five-minute slot; the
+    # 23:55 logging window starts on a slot boundary so it is never skipped
+    write_slot = (now.date(), now.hour, now.minute // 5)
+    if st.session_state.get('last_write_slot') != write_slot:
+        st.session_state['last_write_slot'] = write_slot
+        if log_daily_reading(now, rain_today, today_harvest):
+            # The tabs below read the logs, so refresh the whole page once
+            st.rerun()
+
+    st.title("Rainwater Harvesting Dashboard - IUST Campus (CEED)")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Temperature", f"{weather['temperature'] if weather['temperature'] is not None else '-'} °C")
+    col2.metric("Humidity", f"{weather['humidity'] if weather['humidity'] is not None else '-'} %")
+    col3.metric("Rainfall (Today)", f"{rain_today} mm")
+    col4.metric("Date", now.strftime("%d %b %Y"))
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_harvest():
+    _, rain_today, today_harvest = get_live_reading()
+    col1, col2 = st.columns(2)
+    col1.metric("Rainfall", f"{rain_today} mm")
+    col2.metric("Harvested", f"{int(today_harvest)} L")
 
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("Temperature", f"{temp if temp is not None else '-'} °C")
-col2.metric("Humidity", f"{hum if hum is not None else '-'} %")
-col3.metric("Rainfall (Today)", f"{rain_today} mm")
-col4.metric("Date", now.strftime("%d %b %Y"))
+live_header()
 
 # ========== Tabs ==========
 tab1, tab2 = st.tabs(["Live Dashboard", "Year Wise Harvesting"])
@@ -121,38 +130,35 @@ tab1, tab2 = st.tabs(["Live Dashboard", "Year Wise Harvesting"])
 # ========== TAB 1 ==========
 with tab1:
     st.subheader("Live Harvesting - CEED Building")
-    col1, col2 = st.columns(2)
-    col1.metric("Rainfall", f"{rain_today} mm")
-    col2.metric("Harvested", f"{int(today_harvest)} L")
-
-    df_plot = df_daily.copy()
-    df_plot['date'] = pd.to_datetime(df_plot['date'], errors='coerce')
-    df_plot = df_plot.dropna(subset=['date'])
-    df_plot['year'] = df_plot['date'].dt.year
-    df_plot['month'] = df_plot['date'].dt.strftime('%b')
-    df_plot['month_num'] = df_plot['date'].dt.month
+    live_harvest()
 
-    df_building = df_plot[df_plot['building_name'] == BUILDING_NAME]
+    df_building = load_building_log(DAILY_LOG_FILE, BUILDING_NAME)
 
     if not df_building.empty:
-        selected_year = st.selectbox("Select Year", sorted(df_building['year'].unique(), reverse=True))
-        year_df = df_building[df_building['year'] == selected_year]
-
-        year_df['rainfall_mm'] = pd.to_numeric(year_df['rainfall_mm'], errors='coerce')
-        year_df['water_harvested_litres'] = pd.to_numeric(year_df['water_harvested_litres'], errors='coerce')
+        daily_mtime = log_mtime(DAILY_LOG_FILE)
+        selected_year = st.selectbox("Select Year", yearly_totals(DAILY_LOG_FILE, daily_mtime, BUILDING_NAME)['year'])
+        year_df = year_slice(df_building, selected_year)
 
-        month_df = (
-            year_df.groupby(['month', 'month_num'])[['rainfall_mm', 'water_harvested_litres']]
-            .sum()
-            .reset_index()
-            .sort_values('month_num')
-        )
+        month_df = monthly_summary(DAILY_LOG_FILE, daily_mtime, BUILDING_NAME, selected_year)
 
         st.write(f"Monthly Water Harvesting - {BUILDING_NAME} ({selected_year})")
-        fig1 = px.bar(month_df, x='month', y='water_harvested_litres', labels={'water_harvested_litres': 'Litres'}, color_discrete_sequence=["teal"])
+        # Only the plotted columns go into the figures (and their cache keys)
+        fig1 = pio.from_json(build_monthly_fig(month_df[['month', 'water_harvested_litres']]))
         st.plotly_chart(fig1, use_container_width=True)
 
-        fig2 = px.line(year_df, x='date', y=['rainfall_mm', 'water_harvested_litres'], labels={"value": "Amount", "variable": "Metric"}, title=f"📈 Daily Rainfall & Harvesting - {BUILDING_NAME} ({selected_year})")
+        # The all-years view can run to thousands of daily points, so it is
+        # downsampled; litres are rainfall times a fixed factor per building,
+        # so picking points on litres keeps the rainfall peaks too
+        if st.toggle("Show all years"):
+            plot_df = downsample_for_plot(df_building[['date', 'rainfall_mm', 'water_harvested_litres']], 'water_harvested_litres')
+            period = "All Years"
+        else:
+            plot_df = year_df[['date', 'rainfall_mm', 'water_harvested_litres']]
+            period = selected_year
+        fig2 = pio.from_json(build_daily_fig(
+            plot_df,
+            f"📈 Daily Rainfall & Harvesting - {BUILDING_NAME} ({period})"
+        ))
         st.plotly_chart(fig2, use_container_width=True)
 
         with st.expander("Show Raw Daily Data"):
@@ -162,36 +168,18 @@ with tab1:
 with tab2:
     st.header("📅 Year Wise Water Harvesting Summary")
 
-    df_summary = df_monthly.copy()
-    df_summary['date'] = pd.to_datetime(df_summary['date'], errors='coerce')
-    df_summary = df_summary.dropna(subset=['date'])
-
-    df_summary['year'] = df_summary['date'].dt.year
-    df_summary['month'] = df_summary['date'].dt.strftime('%b')
-    df_summary['month_num'] = df_summary['date'].dt.month
-
-    df_summary = df_summary[df_summary['building_name'] == BUILDING_NAME]
+    df_summary = load_building_log(MONTHLY_SOURCE, BUILDING_NAME)
 
     if not df_summary.empty:
-        year_summary = (
-            df_summary.groupby('year')[['water_harvested_litres']]
-            .sum()
-            .reset_index()
-            .sort_values('year', ascending=False)
-        )
+        monthly_mtime = source_mtime(MONTHLY_SOURCE)
+        year_summary = yearly_totals(MONTHLY_SOURCE, monthly_mtime, BUILDING_NAME)
 
         st.subheader("Total Water Harvested by Year")
         st.dataframe(year_summary.rename(columns={"year": "Year", "water_harvested_litres": "Total (Litres)"}))
 
-        selected_year_tab2 = st.selectbox("Select Year to View Monthly", year_summary['Year'])
+        selected_year_tab2 = st.selectbox("Select Year to View Monthly", year_summary['year'])
 
-        monthly_breakdown = (
-            df_summary[df_summary['year'] == selected_year_tab2]
-            .groupby(['month', 'month_num'])[['rainfall_mm', 'water_harvested_litres']]
-            .sum()
-            .reset_index()
-            .sort_values('month_num')
-        )
+        monthly_breakdown = monthly_summary(MONTHLY_SOURCE, monthly_mtime, BUILDING_NAME, selected_year_tab2)
 
         st.subheader(f"Monthly Harvesting for {selected_year_tab2}")
         st.dataframe(
@@ -209,22 +197,20 @@ st.markdown("Download Log Files")
 col1, col2 = st.columns(2)
 
 if os.path.exists(DAILY_LOG_FILE):
-    with open(DAILY_LOG_FILE, 'rb') as f:
-        col1.download_button(
-            label="Download Daily Log",
-            data=f,
-            file_name="daily_log.csv",
-            mime="text/csv"
-        )
-
-if os.path.exists(MONTHLY_LOG_FILE):
-    with open(MONTHLY_LOG_FILE, 'rb') as f:
-        col2.download_button(
-            label="Download Monthly Log",
-            data=f,
-            file_name="rainfall_log.csv",
-            mime="text/csv"
-        )
+    col1.download_button(
+        label="Download Daily Log",
+        data=log_csv_bytes(DAILY_LOG_FILE, log_mtime(DAILY_LOG_FILE)),
+        file_name="daily_log.csv",
+        mime="text/csv"
+    )
+
+if source_exists(MONTHLY_SOURCE):
+    col2.download_button(
+        label="Download Monthly Log",
+        data=log_csv_bytes(MONTHLY_SOURCE, source_mtime(MONTHLY_SOURCE)),
+        file_name="rainfall_log.csv",
+        mime="text/csv"
+    )
 
 
 
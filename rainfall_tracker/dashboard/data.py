@@ -0,0 +1,305 @@
+import io
+import os
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import streamlit as st
+
+MONTH_ABBR = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+# Ordered so month labels sort and compare in calendar order
+MONTH_DTYPE = pd.CategoricalDtype(MONTH_ABBR, ordered=True)
+# A single year is at most 366 points; the all-years chart is cut down to this
+LINE_CHART_MAX_POINTS = 2000
+# Persisted caches are keyed on file mtime, so every append adds an entry.
+# max_entries only bounds the in-memory copies; writers also drop the
+# superseded pickles from disk (clear_persisted_reads)
+LOG_CACHE_ENTRIES = 4
+LOG_COLUMNS = ['date', 'building_name', 'rainfall_mm', 'water_harvested_litres']
+LOG_DTYPES = {
+    'date': 'datetime64[ns]',
+    'building_name': 'category',
+    'rainfall_mm': 'float32',
+    'water_harvested_litres': 'float64'
+}
+# Read-side schema: older files stored litres as int32, and pyarrow only
+# unifies them with newer float64 fragments when the target type is given
+LOG_SCHEMA = pa.schema([
+    ('date', pa.timestamp('ns')),
+    ('building_name', pa.dictionary(pa.int32(), pa.string())),
+    ('rainfall_mm', pa.float32()),
+    ('water_harvested_litres', pa.float64())
+])
+
+# ========== Load Logs ==========
+def migrate_csv_log(file_path):
+    # One-shot conversion of the legacy CSV log sitting next to the Parquet file
+    csv_path = os.path.splitext(file_path)[0] + ".csv"
+    if os.path.exists(file_path) or not os.path.exists(csv_path):
+        return
+    # Parsed by pyarrow's multithreaded reader. Values are read as strings so a
+    # hand-edited cell cannot fail the whole migration: unparseable dates drop
+    # the row, unparseable or missing readings count as 0
+    table = pacsv.read_csv(
+        csv_path,
+        parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+        convert_options=pacsv.ConvertOptions(column_types={
+            'date': pa.string(),
+            'building_name': pa.dictionary(pa.int32(), pa.string()),
+            'rainfall_mm': pa.string(),
+            'water_harvested_litres': pa.string()
+        })
+    )
+    dates = pc.strptime(table['date'], format='%Y-%m-%d', unit='ns', error_is_null=True)
+    df = table.set_column(table.schema.get_field_index('date'), 'date', dates).to_pandas()
+    df = df.dropna(subset=['date'])
+    for col in ['rainfall_mm', 'water_harvested_litres']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    if file_path.endswith(".parquet"):
+        save_log(df, file_path)
+    elif df.empty:
+        # write_dataset writes nothing for zero rows; an empty dataset directory
+        # still marks the migration as done so the CSV is not re-read
+        os.makedirs(file_path, exist_ok=True)
+    else:
+        append_log(df, file_path)
+
+def log_mtime(file_path):
+    # Appending a fragment only touches its year directory, so check those too
+    mtime = os.path.getmtime(file_path)
+    if os.path.isdir(file_path):
+        for entry in os.scandir(file_path):
+            if entry.is_dir():
+                mtime = max(mtime, entry.stat().st_mtime)
+    return mtime
+
+def add_date_parts(df):
+    # Derived once per file version so the tabs never re-run .dt accessors
+    df['year'] = df['date'].dt.year.astype('int16')
+    df['month_num'] = df['date'].dt.month.astype('int8')
+    df['month'] = pd.Categorical.from_codes(df['month_num'].to_numpy() - 1, dtype=MONTH_DTYPE)
+    df['year_month'] = df['year'].astype('int32') * 12 + df['month_num'] - 1
+    return df
+
+@st.cache_data(persist="disk", max_entries=LOG_CACHE_ENTRIES, show_spinner=False)
+def read_log(file_path, mtime):
+    # mtime is only part of the cache key, so the cache invalidates when the file changes
+    df = pd.read_parquet(file_path, engine='pyarrow', columns=LOG_COLUMNS, schema=LOG_SCHEMA)
+    return add_date_parts(df.sort_values('date', kind='stable', ignore_index=True))
+
+def empty_log():
+    return add_date_parts(pd.DataFrame(columns=LOG_COLUMNS).astype(LOG_DTYPES))
+
+def load_log(file_path):
+    migrate_csv_log(file_path)
+    if os.path.exists(file_path):
+        return read_log(file_path, log_mtime(file_path))
+    return empty_log()
+
+# ========== Monthly View ==========
+# A source is a log path, or a (daily_path, archive_path) pair naming the
+# monthly totals derived from the daily log
+def monthly_source(daily_path, archive_path):
+    return (daily_path, archive_path)
+
+def source_paths(source):
+    return source if isinstance(source, tuple) else (source,)
+
+def source_exists(source):
+    return any(os.path.exists(p) for p in source_paths(source))
+
+def source_mtime(source):
+    if isinstance(source, tuple):
+        return tuple(log_mtime(p) if os.path.exists(p) else 0.0 for p in source)
+    return log_mtime(source)
+
+@st.cache_data(persist="disk", max_entries=LOG_CACHE_ENTRIES, show_spinner=False)
+def read_monthly(daily_path, archive_path, mtimes):
+    # Monthly totals come from the daily log; archived month rows only fill
+    # in months (per building) that the daily log does not cover
+    daily = read_log(daily_path, mtimes[0]) if mtimes[0] else empty_log()
+    derived = add_date_parts(
+        daily.groupby([pd.Grouper(key='date', freq='MS'), 'building_name'], observed=True)[['rainfall_mm', 'water_harvested_litres']]
+        .sum()
+        .reset_index()
+        .astype(LOG_DTYPES)
+    )
+    frames = [derived]
+    if mtimes[1]:
+        archive = read_log(archive_path, mtimes[1])
+        derived_keys = pd.MultiIndex.from_arrays([derived['building_name'].astype(str), derived['year_month']])
+        archive_keys = pd.MultiIndex.from_arrays([archive['building_name'].astype(str), archive['year_month']])
+        # Archive rows carry arbitrary in-month dates; align them with the
+        # month-start dates of the derived rows
+        kept = archive[~archive_keys.isin(derived_keys)]
+        frames.insert(0, kept.assign(date=kept['date'].dt.to_period('M').dt.to_timestamp()))
+    df = pd.concat([f[LOG_COLUMNS] for f in frames], ignore_index=True).astype(LOG_DTYPES)
+    return add_date_parts(df.sort_values('date', kind='stable', ignore_index=True))
+
+def read_source(source, mtime):
+    if isinstance(source, tuple):
+        return read_monthly(*source, mtime)
+    return read_log(source, mtime)
+
+@st.cache_data(persist="disk", max_entries=LOG_CACHE_ENTRIES, show_spinner=False)
+def building_groups(source, mtime):
+    # Split once per file version so selecting a building is a dict lookup
+    df = read_source(source, mtime)
+    return {
+        name: sub.reset_index(drop=True)
+        for name, sub in df.groupby('building_name', observed=True, sort=False)
+    }
+
+def building_log(source, mtime, building):
+    return building_groups(source, mtime).get(building, empty_log())
+
+def load_building_log(source, building):
+    for path in source_paths(source):
+        migrate_csv_log(path)
+    if source_exists(source):
+        return building_log(source, source_mtime(source), building)
+    return empty_log()
+
+# ========== Save Logs ==========
+def canonical_log(df):
+    # Building names are normalised once on the way to disk so readers never
+    # strip/upper-case them; mapping a category only touches its categories
+    df = df[LOG_COLUMNS].astype(LOG_DTYPES)
+    df['building_name'] = df['building_name'].map(lambda name: name.strip().upper(), na_action='ignore').astype('category')
+    return df
+
+def save_log(df, file_path):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    # Kept in date order so lookups for recent days only touch the tail
+    df = canonical_log(df).sort_values('date', kind='stable')
+    df.to_parquet(file_path, engine='pyarrow', compression='zstd', index=False)
+    clear_persisted_reads()
+
+def append_log(df, dataset_dir):
+    # Writes only the new rows as a fresh fragment under dataset_dir/year=YYYY/
+    df = canonical_log(df)
+    table = pa.Table.from_pandas(df.assign(year=df['date'].dt.year), preserve_index=False)
+    ds.write_dataset(
+        table,
+        dataset_dir,
+        format='parquet',
+        partitioning=['year'],
+        partitioning_flavor='hive',
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd')
+    )
+    clear_persisted_reads()
+
+def read_marker(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+def write_marker(path, value):
+    # Swapped in with os.replace so a concurrent reader never sees a partial write
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+
+def clear_persisted_reads():
+    # Earlier file versions can never be requested again once a log changes
+    for cached in (read_log, read_monthly, building_groups):
+        cached.clear()
+
+def year_slice(df, year):
+    # Logs are date-sorted, so a year is one contiguous block found by binary search
+    year = int(year)
+    lo, hi = df['date'].searchsorted([pd.Timestamp(year, 1, 1), pd.Timestamp(year + 1, 1, 1)])
+    return df.iloc[lo:hi]
+
+def is_logged(df, day, building_name):
+    # Rows for `day` are one contiguous block of the date-sorted log
+    day = pd.Timestamp(day)
+    lo, hi = df['date'].searchsorted([day, day + pd.Timedelta(days=1)])
+    return bool((df['building_name'].iloc[lo:hi] == building_name).any())
+
+# ========== Cached Aggregations ==========
+def sum_by_group(codes, values, n_groups):
+    # Compiled scatter-add over integer group codes; no per-group Python overhead
+    return np.bincount(codes, weights=values, minlength=n_groups)
+
+@st.cache_data(show_spinner=False)
+def month_totals(source, mtime, building):
+    # One bincount pass over year_month gives a (years x 12) grid that the
+    # yearly and the monthly views are both read from
+    df = building_log(source, mtime, building)
+    year_month = df['year_month'].to_numpy()
+    if len(year_month) == 0:
+        empty = np.zeros((0, 12))
+        return 0, empty, empty, empty
+    first_year = int(year_month.min()) // 12
+    codes = year_month - first_year * 12
+    n_cells = (int(codes.max()) // 12 + 1) * 12
+    counts = np.bincount(codes, minlength=n_cells).reshape(-1, 12)
+    rain = sum_by_group(codes, df['rainfall_mm'].to_numpy(), n_cells).reshape(-1, 12)
+    harvest = sum_by_group(codes, df['water_harvested_litres'].to_numpy(), n_cells).reshape(-1, 12)
+    return first_year, counts, rain, harvest
+
+@st.cache_data(show_spinner=False)
+def monthly_summary(source, mtime, building, year):
+    first_year, *grids = month_totals(source, mtime, building)
+    row = int(year) - first_year
+    counts, rain, harvest = (grid[row] if 0 <= row < len(grid) else np.zeros(12) for grid in grids)
+    # Grid columns are already in calendar order
+    monthly = pd.DataFrame({
+        'month': pd.Categorical.from_codes(np.arange(12), dtype=MONTH_DTYPE),
+        'month_num': np.arange(1, 13, dtype='int8'),
+        'rainfall_mm': rain.astype('float32'),
+        'water_harvested_litres': harvest.round().astype('int64')
+    })
+    return monthly[counts > 0].reset_index(drop=True)
+
+@st.cache_data(show_spinner=False)
+def yearly_totals(source, mtime, building):
+    first_year, counts, _, harvest = month_totals(source, mtime, building)
+    present = counts.sum(axis=1) > 0
+    summary = pd.DataFrame({
+        'year': (np.arange(len(counts)) + first_year).astype('int16')[present],
+        'water_harvested_litres': harvest.sum(axis=1)[present].round().astype('int64')
+    })
+    return summary.iloc[::-1].reset_index(drop=True)
+
+@st.cache_data(show_spinner=False)
+def log_csv_bytes(source, mtime):
+    # Serialised once per file version rather than on every rerun
+    buf = io.BytesIO()
+    read_source(source, mtime)[LOG_COLUMNS].to_csv(buf, index=False)
+    return buf.getvalue()
+
+# ========== Chart Downsampling ==========
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: keep the end points and, per bucket, the
+    # point spanning the largest triangle with the previous pick and next bucket mean
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+def downsample_for_plot(df, y_col, n_out=LINE_CHART_MAX_POINTS):
+    if len(df) <= n_out:
+        return df
+    x = df['date'].to_numpy().astype(np.int64).astype(np.float64)
+    return df.iloc[lttb_indices(x, df[y_col].to_numpy(np.float64), n_out)]
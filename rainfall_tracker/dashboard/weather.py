@@ -0,0 +1,60 @@
+import re
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import streamlit as st
+
+WEATHER_URL = "https://iust.ac.in/"
+WEATHER_TIMEOUT = (2, 5)  # (connect, read) seconds
+WEATHER_RETRY = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+# Bytes pattern so the raw response body is searched without decoding it first
+WEATHER_RE = re.compile(
+    rb"Temperature[:\s]*([\d]+).*?C.*?Humidity[:\s]*([\d]+).*?%.*?Rainfall[:\s]*([\d]+).*?mm",
+    re.DOTALL
+)
+TAG_RE = re.compile(rb"<[^>]+>")
+
+# ========== Fetch Live Weather ==========
+@st.cache_resource
+def get_http_session():
+    # Shared across sessions and ttl expiries so the TCP/TLS connection is reused
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=WEATHER_RETRY))
+    session.headers.update({"Accept-Encoding": "gzip"})
+    return session
+
+@st.cache_resource
+def get_last_reading():
+    # Validators and parsed values of the last good response, for conditional GETs
+    return {}
+
+@st.cache_data(ttl=300, show_spinner=False)
+def fetch_live_weather(timeout=WEATHER_TIMEOUT):
+    error = None
+    last = get_last_reading()
+    headers = {}
+    if last.get('etag'):
+        headers['If-None-Match'] = last['etag']
+    if last.get('last_modified'):
+        headers['If-Modified-Since'] = last['last_modified']
+    try:
+        r = get_http_session().get(WEATHER_URL, headers=headers, timeout=timeout)
+        # Unchanged page: no body to parse, reuse the previous readings
+        if r.status_code == 304 and 'reading' in last:
+            return last['reading']
+        # The three readings are usually plain text in the page source, so try
+        # the raw HTML first; when markup splits them up, blanking the tags is
+        # enough for the pattern and avoids building a DOM
+        m = WEATHER_RE.search(r.content)
+        if not m:
+            m = WEATHER_RE.search(TAG_RE.sub(b" ", r.content))
+        if m:
+            temp, hum, rain = m.groups()
+            reading = {'temperature': int(temp), 'humidity': int(hum), 'rainfall_mm': int(rain), 'error': None}
+            last.update(etag=r.headers.get('ETag'), last_modified=r.headers.get('Last-Modified'), reading=reading)
+            return reading
+    except Exception as e:
+        # Reported by the caller: elements drawn inside a cached function are
+        # replayed at every call site
+        error = str(e)
+    return {'temperature': None, 'humidity': None, 'rainfall_mm': None, 'error': error}
@@ -1,18 +1,24 @@
 import pandas as pd
 import qrcode
 import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
 
 BUILDINGS_CSV = '../data/buildings.csv'
 QR_DIR = '../data/qr_codes/'
 BASE_URL = 'http://localhost:8501/?building='
 
-os.makedirs(QR_DIR, exist_ok=True)
-
-df = pd.read_csv(BUILDINGS_CSV)
-for _, row in df.iterrows():
-    building = row['building_name']
-    url = f"{BASE_URL}{building.replace(' ', '%20')}"
+def make_qr(building):
+    url = f"{BASE_URL}{quote(building)}"
     img = qrcode.make(url)
     img.save(os.path.join(QR_DIR, f"{building}.png"))
 
-print("QR codes generated in /data/qr_codes/")
+if __name__ == "__main__":
+    os.makedirs(QR_DIR, exist_ok=True)
+
+    df = pd.read_csv(BUILDINGS_CSV)
+    # Each QR render + PNG encode is independent and CPU-bound
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(make_qr, df['building_name']))
+
+    print("QR codes generated in /data/qr_codes/")
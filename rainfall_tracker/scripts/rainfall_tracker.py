@@ -1,46 +1,71 @@
 import requests
-from bs4 import BeautifulSoup
-import csv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import datetime
+import html
+import re
 import os
+import numpy as np
+import pandas as pd
 
 BUILDING_FILE = '../data/buildings.csv'
-LOG_FILE = '../data/rainfall_log.csv'
+LOG_DIR = '../data/rainfall_log'  # Parquet dataset partitioned by year
+LEGACY_LOG_FILE = '../data/rainfall_log.csv'
 IUST_URL = "https://www.iust.ac.in"
-
-def get_today_rainfall_mm():
-    response = requests.get(IUST_URL)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    text = soup.get_text()
-    for line in text.splitlines():
-        if 'Rainfall' in line and 'mm' in line:
-            parts = line.strip().split()
-            try:
-                mm = float(parts[1])
-                return mm
-            except:
-                continue
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=2,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+RAINFALL_RE = re.compile(r"Rainfall[:\s]*(\d+(?:\.\d+)?)\s*mm")
+TAG_RE = re.compile(r"<[^>]+>")
+def get_today_rainfall_mm(timeout=5):
+    response = SESSION.get(IUST_URL, timeout=timeout)
+    # Search the raw page first; when markup splits the label from its value,
+    # blank the tags and search the remaining text
+    page = response.content.decode('utf-8', 'ignore')
+    m = RAINFALL_RE.search(page) or RAINFALL_RE.search(html.unescape(TAG_RE.sub(" ", page)))
+    if m:
+        return float(m.group(1))
     raise ValueError("Rainfall data not found")
 
 def read_buildings():
-    with open(BUILDING_FILE, 'r') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+    return pd.read_csv(BUILDING_FILE)
+
+def append_log(df):
+    # Adds one new file per run under LOG_DIR/year=YYYY/, with building names
+    # trimmed and upper-cased like the dashboard's writer
+    df.assign(
+        building_name=df['building_name'].astype(str).str.strip().str.upper(),
+        year=df['date'].dt.year
+    ).to_parquet(LOG_DIR, partition_cols=['year'], compression='zstd', index=False)
+
+def migrate_csv_log():
+    # One-shot conversion of the CSV log written by earlier versions
+    if os.path.exists(LOG_DIR) or not os.path.isfile(LEGACY_LOG_FILE):
+        return
+    df = pd.read_csv(LEGACY_LOG_FILE, dtype=str, on_bad_lines='skip')
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+    df = df.dropna(subset=['date'])
+    for col in ['rainfall_mm', 'water_harvested_litres']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    if not df.empty:
+        append_log(df)
 
-def write_log(date, building_data, rainfall_mm):
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["date", "building_name", "rainfall_mm", "water_harvested_litres"])
-        for b in building_data:
-            area = float(b['area_m2'])
-            coeff = float(b['runoff_coefficient'])
-            harvested = rainfall_mm * area * coeff
-            writer.writerow([date, b['building_name'], rainfall_mm, round(harvested, 2)])
+def write_log(date, buildings, rainfall_mm):
+    migrate_csv_log()
+    # One multiply over the building columns instead of a loop per building
+    harvested = rainfall_mm * buildings['area_m2'].to_numpy(float) * buildings['runoff_coefficient'].to_numpy(float)
+    append_log(pd.DataFrame({
+        'date': pd.Timestamp(date),
+        'building_name': buildings['building_name'],
+        'rainfall_mm': rainfall_mm,
+        'water_harvested_litres': np.round(harvested, 2)
+    }))
 
 def main():
-    today = datetime.date.today().isoformat()
+    today = datetime.date.today()
     rainfall = get_today_rainfall_mm()
     buildings = read_buildings()
     write_log(today, buildings, rainfall)
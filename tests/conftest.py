@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The dashboard and the scripts are run from their own directories and import
+# their modules by bare name, so the tests do the same
+sys.path.insert(0, os.path.join(ROOT, "rainfall_tracker", "dashboard"))
+sys.path.insert(0, os.path.join(ROOT, "rainfall_tracker", "scripts"))
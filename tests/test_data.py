@@ -0,0 +1,203 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data
+
+CSV_HEADER = "date,building_name,rainfall_mm,water_harvested_litres\n"
+
+
+def make_log(rows):
+    return data.canonical_log(pd.DataFrame(rows, columns=data.LOG_COLUMNS).assign(
+        date=lambda df: pd.to_datetime(df['date'])
+    ))
+
+
+# ========== CSV Migration ==========
+def test_migrate_skips_malformed_rows_and_coerces_bad_values(tmp_path):
+    (tmp_path / "log.csv").write_text(
+        CSV_HEADER
+        + "2025-01-02,CEED,,5\n"            # missing reading -> 0
+        + "not-a-date,CEED,1,1\n"           # bad date -> dropped
+        + "2025-01-03,CEED,2,3,extra\n"     # wrong field count -> skipped
+        + "2025-01-04, ceed ,12mm,3\n"      # bad number -> 0, name normalised
+        + "2025-01-05,CEED,2.5,24004.8\n"
+    )
+    target = str(tmp_path / "log.parquet")
+    data.migrate_csv_log(target)
+
+    df = pd.read_parquet(target)
+    assert df['date'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-02', '2025-01-04', '2025-01-05']
+    assert df['building_name'].astype(str).tolist() == ['CEED', 'CEED', 'CEED']
+    assert df['rainfall_mm'].tolist() == [0.0, 0.0, 2.5]
+    assert df['water_harvested_litres'].tolist() == [5.0, 3.0, 24004.8]
+
+
+def test_migrate_into_dataset_directory(tmp_path):
+    (tmp_path / "daily.csv").write_text(CSV_HEADER + "2024-12-31,CEED,1,850\n2025-01-01,CEED,2,1700\n")
+    target = str(tmp_path / "daily")
+    data.migrate_csv_log(target)
+
+    assert sorted(p.name for p in (tmp_path / "daily").iterdir()) == ['year=2024', 'year=2025']
+    df = data.load_log(target)
+    assert df['water_harvested_litres'].tolist() == [850.0, 1700.0]
+    assert df['year'].tolist() == [2024, 2025]
+
+
+def test_migrate_header_only_csv_runs_once(tmp_path):
+    csv_path = tmp_path / "daily.csv"
+    csv_path.write_text(CSV_HEADER)
+    target = str(tmp_path / "daily")
+    data.migrate_csv_log(target)
+    assert (tmp_path / "daily").is_dir()
+
+    # A second call must not touch the CSV again
+    csv_path.write_text(CSV_HEADER + "2025-01-01,CEED,2,1700\n")
+    data.migrate_csv_log(target)
+    assert list((tmp_path / "daily").iterdir()) == []
+    assert data.load_log(target).empty
+
+
+def test_read_log_unifies_int_and_float_litre_files(tmp_path):
+    old = tmp_path / "daily" / "year=2025"
+    old.mkdir(parents=True)
+    pq.write_table(pa.table({
+        'date': pa.array([pd.Timestamp('2025-01-01')], pa.timestamp('ns')),
+        'building_name': ['CEED'],
+        'rainfall_mm': pa.array([1.0], pa.float32()),
+        'water_harvested_litres': pa.array([850], pa.int32())
+    }), old / "old.parquet")
+    data.append_log(make_log([['2025-02-01', 'CEED', 2.0, 24004.8]]), str(tmp_path / "daily"))
+
+    df = data.load_log(str(tmp_path / "daily"))
+    assert df['water_harvested_litres'].tolist() == [850.0, 24004.8]
+
+
+# ========== Writers ==========
+def test_canonical_log_normalises_building_names():
+    df = make_log([
+        ['2025-01-01', ' ceed', 1, 1],
+        ['2025-01-02', 'CEED ', 1, 1],
+        ['2025-01-03', 'library', 1, 1]
+    ])
+    assert df['building_name'].tolist() == ['CEED', 'CEED', 'LIBRARY']
+    assert list(df['building_name'].cat.categories) == ['CEED', 'LIBRARY']
+    assert df.dtypes.astype(str).to_dict() == {
+        'date': 'datetime64[ns]',
+        'building_name': 'category',
+        'rainfall_mm': 'float32',
+        'water_harvested_litres': 'float64'
+    }
+
+
+def test_write_marker_round_trip(tmp_path):
+    marker = str(tmp_path / ".last_logged")
+    assert data.read_marker(marker) == ''
+    data.write_marker(marker, '2025-07-04')
+    data.write_marker(marker, '2025-07-05')
+    assert data.read_marker(marker) == '2025-07-05'
+    assert [p.name for p in tmp_path.iterdir()] == ['.last_logged']
+
+
+# ========== Lookups ==========
+def test_is_logged_only_matches_the_given_day():
+    df = make_log([
+        ['2025-07-04', 'CEED', 1, 1],
+        ['2025-07-06', 'CEED', 1, 1],
+        ['2025-07-06', 'LIBRARY', 1, 1]
+    ])
+    assert data.is_logged(df, datetime.date(2025, 7, 4), 'CEED')
+    assert not data.is_logged(df, datetime.date(2025, 7, 5), 'CEED')
+    assert data.is_logged(df, datetime.date(2025, 7, 6), 'LIBRARY')
+    assert not data.is_logged(df, datetime.date(2025, 7, 4), 'LIBRARY')
+    assert not data.is_logged(df, datetime.date(2025, 7, 7), 'CEED')
+    assert not data.is_logged(data.empty_log(), datetime.date(2025, 7, 4), 'CEED')
+
+
+def test_year_slice_returns_only_that_year():
+    df = make_log([
+        ['2024-12-31', 'CEED', 1, 1],
+        ['2025-01-01', 'CEED', 2, 2],
+        ['2025-12-31', 'CEED', 3, 3],
+        ['2026-01-01', 'CEED', 4, 4]
+    ])
+    assert data.year_slice(df, 2025)['rainfall_mm'].tolist() == [2.0, 3.0]
+    assert data.year_slice(df, '2024')['rainfall_mm'].tolist() == [1.0]
+    assert data.year_slice(df, 2023).empty
+
+
+# ========== Aggregations ==========
+def saved_log(tmp_path, rows):
+    path = str(tmp_path / "log.parquet")
+    data.save_log(make_log(rows), path)
+    return path, data.log_mtime(path)
+
+
+def test_yearly_and_monthly_totals(tmp_path):
+    path, mtime = saved_log(tmp_path, [
+        ['2023-03-01', 'CEED', 1.0, 850.0],
+        ['2023-03-15', 'CEED', 2.0, 1700.0],
+        ['2023-11-02', 'CEED', 0.5, 425.4],
+        ['2025-01-10', 'CEED', 4.0, 3400.0],
+        ['2025-01-10', 'LIBRARY', 9.0, 9000.0]
+    ])
+
+    yearly = data.yearly_totals(path, mtime, 'CEED')
+    assert yearly['year'].tolist() == [2025, 2023]  # gap year 2024 omitted
+    assert yearly['water_harvested_litres'].tolist() == [3400, 2975]
+
+    monthly = data.monthly_summary(path, mtime, 'CEED', 2023)
+    assert monthly['month'].astype(str).tolist() == ['Mar', 'Nov']
+    assert monthly['month_num'].tolist() == [3, 11]
+    assert monthly['rainfall_mm'].tolist() == [3.0, 0.5]
+    assert monthly['water_harvested_litres'].tolist() == [2550, 425]
+
+    assert data.monthly_summary(path, mtime, 'CEED', 2024).empty
+    assert data.monthly_summary(path, mtime, 'CEED', 2030).empty
+
+
+def test_totals_for_unknown_building_are_empty(tmp_path):
+    path, mtime = saved_log(tmp_path, [['2025-01-10', 'CEED', 4.0, 3400.0]])
+    assert data.yearly_totals(path, mtime, 'NOPE').empty
+    assert data.monthly_summary(path, mtime, 'NOPE', 2025).empty
+
+
+def test_monthly_source_prefers_daily_totals_over_archive(tmp_path):
+    archive = str(tmp_path / "monthly.parquet")
+    data.save_log(make_log([
+        ['2025-01-15', 'CEED', 10.0, 8500.0],
+        ['2025-02-28', 'CEED', 20.0, 17000.0]
+    ]), archive)
+    daily = str(tmp_path / "daily")
+    data.append_log(make_log([
+        ['2025-02-03', 'CEED', 1.0, 850.0],
+        ['2025-02-04', 'CEED', 2.0, 1700.0]
+    ]), daily)
+
+    source = data.monthly_source(daily, archive)
+    df = data.read_source(source, data.source_mtime(source))
+    # Every row, archived or derived, is dated on the first of its month
+    assert df['date'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-01', '2025-02-01']
+    assert df['water_harvested_litres'].tolist() == [8500.0, 2550.0]
+
+
+# ========== Chart Downsampling ==========
+def test_downsample_keeps_end_points_and_sorted_order():
+    dates = pd.date_range('2015-01-01', periods=4000, freq='D')
+    litres = pd.Series(range(4000), dtype='float64') % 97
+    litres[1234] = 10000.0  # a spike must survive
+    df = pd.DataFrame({'date': dates, 'water_harvested_litres': litres})
+
+    out = data.downsample_for_plot(df, 'water_harvested_litres', n_out=500)
+    assert len(out) == 500
+    assert out.index.is_monotonic_increasing and out.index.is_unique
+    assert out['date'].iloc[0] == dates[0] and out['date'].iloc[-1] == dates[-1]
+    assert 1234 in out.index
+
+
+def test_downsample_leaves_short_frames_alone():
+    df = pd.DataFrame({'date': pd.date_range('2025-01-01', periods=366, freq='D'), 'water_harvested_litres': 1.0})
+    assert data.downsample_for_plot(df, 'water_harvested_litres') is df
+
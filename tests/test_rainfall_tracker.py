@@ -0,0 +1,66 @@
+import datetime
+import types
+
+import pandas as pd
+import pytest
+
+import rainfall_tracker
+
+
+@pytest.fixture
+def log_paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(rainfall_tracker, "LOG_DIR", str(tmp_path / "rainfall_log"))
+    monkeypatch.setattr(rainfall_tracker, "LEGACY_LOG_FILE", str(tmp_path / "rainfall_log.csv"))
+    return tmp_path
+
+
+def serve(monkeypatch, page):
+    response = types.SimpleNamespace(content=page)
+    monkeypatch.setattr(rainfall_tracker, "SESSION", types.SimpleNamespace(get=lambda *args, **kwargs: response))
+
+
+@pytest.mark.parametrize("page, expected", [
+    (b"<p>Rainfall 4.5 mm today</p>", 4.5),
+    (b"<p>Rainfall: <b>12</b> mm</p>", 12.0),
+    (b"<span>Rainfall</span> <span>12 mm</span>", 12.0),
+    (b"<td>Rainfall:&nbsp;3&nbsp;mm</td>", 3.0),
+])
+def test_get_today_rainfall_mm(monkeypatch, page, expected):
+    serve(monkeypatch, page)
+    assert rainfall_tracker.get_today_rainfall_mm() == expected
+
+
+def test_get_today_rainfall_mm_raises_when_missing(monkeypatch):
+    serve(monkeypatch, b"<p>Temperature: 20 C</p>")
+    with pytest.raises(ValueError):
+        rainfall_tracker.get_today_rainfall_mm()
+
+
+def test_write_log_keeps_two_decimal_litres(log_paths):
+    buildings = pd.DataFrame({
+        'building_name': [' ceed', 'BIG '],
+        'area_m2': [1000, 28241],
+        'runoff_coefficient': [0.85, 0.85]
+    })
+    rainfall_tracker.write_log(datetime.date(2026, 10, 14), buildings, 1.0)
+
+    df = pd.read_parquet(rainfall_tracker.LOG_DIR).sort_values('building_name')
+    assert df['building_name'].tolist() == ['BIG', 'CEED']
+    assert df['water_harvested_litres'].tolist() == [24004.85, 850.0]
+    assert df['date'].tolist() == [pd.Timestamp('2026-10-14')] * 2
+
+
+def test_migrate_csv_log_tolerates_bad_rows_and_values(log_paths):
+    (log_paths / "rainfall_log.csv").write_text(
+        "date,building_name,rainfall_mm,water_harvested_litres\n"
+        "2025-06-01,CEED,3.0,2550.0\n"
+        "bad,CEED,1,1\n"
+        "2025-06-02,CEED,1,2,extra\n"
+        "2025-06-03,CEED,12mm,3\n"
+    )
+    rainfall_tracker.migrate_csv_log()
+
+    df = pd.read_parquet(rainfall_tracker.LOG_DIR).sort_values('date')
+    assert df['date'].dt.strftime('%Y-%m-%d').tolist() == ['2025-06-01', '2025-06-03']
+    assert df['rainfall_mm'].tolist() == [3.0, 0.0]
+    assert df['water_harvested_litres'].tolist() == [2550.0, 3.0]
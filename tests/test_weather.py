@@ -0,0 +1,61 @@
+import types
+
+import pytest
+
+import weather
+
+
+class FakeResponse:
+    def __init__(self, content=b"", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    # Replaces the shared session with one answering from `handler`
+    def install(handler):
+        monkeypatch.setattr(weather, "get_http_session", lambda: types.SimpleNamespace(get=handler))
+        weather.fetch_live_weather.clear()
+        weather.get_last_reading.clear()
+    yield install
+    weather.fetch_live_weather.clear()
+    weather.get_last_reading.clear()
+
+
+@pytest.mark.parametrize("page", [
+    "<body>Temperature: 23 °C Humidity: 70 % Rainfall: 4 mm</body>".encode(),
+    b"<div><span>Temperature:</span><b>23</b> &deg;C <span>Humidity:</span> <b>70</b>% Rainfall: <i>4</i> mm</div>",
+])
+def test_fetch_parses_plain_and_split_markup(serve, page):
+    serve(lambda *args, **kwargs: FakeResponse(page))
+    assert weather.fetch_live_weather() == {'temperature': 23, 'humidity': 70, 'rainfall_mm': 4, 'error': None}
+
+
+def test_fetch_reports_missing_readings_and_errors(serve):
+    serve(lambda *args, **kwargs: FakeResponse(b"<body>nothing here</body>"))
+    assert weather.fetch_live_weather()['rainfall_mm'] is None
+
+    def fail(*args, **kwargs):
+        raise OSError("unreachable")
+    serve(fail)
+    result = weather.fetch_live_weather()
+    assert result['rainfall_mm'] is None
+    assert result['error'] == "unreachable"
+
+
+def test_fetch_reuses_reading_on_not_modified(serve):
+    sent = []
+
+    def handler(*args, headers=None, **kwargs):
+        sent.append(dict(headers))
+        if headers.get('If-None-Match') == '"v1"':
+            return FakeResponse(status_code=304)
+        return FakeResponse(b"Temperature: 23 C Humidity: 70 % Rainfall: 4 mm", headers={'ETag': '"v1"'})
+
+    serve(handler)
+    first = weather.fetch_live_weather()
+    weather.fetch_live_weather.clear()
+    assert weather.fetch_live_weather() == first
+    assert sent == [{}, {'If-None-Match': '"v1"'}]